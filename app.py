@@ -3,9 +3,6 @@ import os
 import sys
 import threading
 import time
-import sounddevice as sd
-import numpy as np
-import scipy.io.wavfile as wav
 from batch_processor import BatchProcessor
 
 # Page Config
@@ -71,11 +68,26 @@ if 'last_processed_file' not in st.session_state:
 st.sidebar.header("Settings")
 
 # Microphone Selection
-devices = sd.query_devices()
-input_devices = [f"{d['index']}: {d['name']}" for d in devices if d['max_input_channels'] > 0]
+@st.cache_resource(ttl=60)
+def get_input_devices():
+    """
+    Enumerates input devices once per minute instead of on every script
+    rerun - PortAudio enumeration can take hundreds of ms, and Streamlit
+    reruns the whole script on each widget interaction. The TTL lets a
+    newly plugged-in mic show up eventually.
 
-# Try to find default device index
-default_device_index = sd.default.device[0]
+    sounddevice is imported lazily here (recording itself happens in a
+    subprocess) so cold starts don't pay for PortAudio init either.
+    """
+    import sounddevice as sd
+    devices = sd.query_devices()
+    inputs = [(d['index'], d['name']) for d in devices if d['max_input_channels'] > 0]
+    return inputs, sd.default.device[0]
+
+device_list, default_device_index = get_input_devices()
+input_devices = [f"{idx}: {name}" for idx, name in device_list]
+
+# Try to find where the default device is in our list
 default_option_index = 0
 
 # Find where the default device is in our list
@@ -107,15 +119,14 @@ def update_status():
     else:
         volume_bar.progress(0)
 
-import signal
 import subprocess
 
 # Process Management
-if 'recorder_pid' not in st.session_state:
-    st.session_state.recorder_pid = None
+if 'recorder_proc' not in st.session_state:
+    st.session_state.recorder_proc = None
 
 def start_recording_subprocess():
-    if st.session_state.recorder_pid is not None:
+    if st.session_state.recorder_proc is not None:
         return # Already running
 
     cmd = [sys.executable, "recorder_process.py", str(selected_device_index), RECORDING_FILE]
@@ -128,9 +139,10 @@ def start_recording_subprocess():
             pass
             
     try:
-        # Start the process
+        # Start the process. Keep the Popen object (not just the pid) so
+        # stopping can wait on the actual process state.
         proc = subprocess.Popen(cmd)
-        st.session_state.recorder_pid = proc.pid
+        st.session_state.recorder_proc = proc
         st.session_state.recording = True
         st.success(f"Recording started (PID: {proc.pid})")
     except Exception as e:
@@ -159,31 +171,39 @@ def start_pipeline():
     
     t = threading.Thread(target=run_pipeline_thread, args=(proc,))
     t.start()
+def recording_file_ready():
+    # 44 bytes is a bare WAV header with no samples
+    return os.path.exists(RECORDING_FILE) and os.path.getsize(RECORDING_FILE) > 44
+
 def stop_recording_subprocess():
-    pid = st.session_state.recorder_pid
-    if pid is None:
+    proc = st.session_state.recorder_proc
+    if proc is None:
         return
 
     try:
-        os.kill(pid, signal.SIGTERM) # Send SIGTERM to allow graceful exit & saving
-        
-        # Wait a moment for file save
         with st.spinner("Saving audio file..."):
-            time.sleep(2) 
-            
-        st.session_state.recorder_pid = None
+            proc.terminate() # SIGTERM to allow graceful exit & saving
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                st.warning("Recorder didn't exit in time, killing it.")
+                proc.kill()
+                proc.wait()
+
+            # The process has exited; give the filesystem a moment at most
+            deadline = time.time() + 2
+            while not recording_file_ready() and time.time() < deadline:
+                time.sleep(0.05)
+
+        st.session_state.recorder_proc = None
         st.session_state.recording = False
-        
-        if os.path.exists(RECORDING_FILE):
+
+        if recording_file_ready():
              st.success(f"Saved to {RECORDING_FILE}")
              start_pipeline()
         else:
              st.error("Recording file not found after stop.")
 
-    except ProcessLookupError:
-        st.warning("Recorder process was already gone.")
-        st.session_state.recorder_pid = None
-        st.session_state.recording = False
     except Exception as e:
         st.error(f"Error stopping: {e}")
 
@@ -228,9 +248,16 @@ with main_cols[0]:
         is_running = st.session_state.processor.is_running
         
         if is_running:
-            st.warning("Pipeline Active")
-            update_status()
-            time.sleep(1)
+            # Poll inside a placeholder instead of sleep + st.rerun():
+            # only this region and the sidebar widgets redraw while the
+            # pipeline runs, rather than re-executing the whole script
+            # (device lookup, widget wiring, file checks) every second.
+            status_area = st.empty()
+            while st.session_state.processor.is_running:
+                status_area.warning(f"Pipeline Active — {st.session_state.processor.status_message}")
+                update_status()
+                time.sleep(2)
+            # One full rerun at the end so the finished notes render
             st.rerun()
         else:
             update_status()
@@ -242,12 +269,17 @@ with main_cols[0]:
              with open(RECORDING_FILE, "rb") as f:
                   st.download_button("💾 Download .wav", f, file_name="recording.wav")
 
+@st.cache_data(ttl=2)
+def load_notes(path):
+    """Cached so the notes file isn't re-read from disk on every rerun."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
 with main_cols[1]:
     with st.container(border=True):
         st.header("📝 Lecture Notes")
         if os.path.exists(FINAL_NOTES_FILE):
-            with open(FINAL_NOTES_FILE, "r", encoding="utf-8") as f:
-                notes_content = f.read()
+            notes_content = load_notes(FINAL_NOTES_FILE)
             st.markdown(notes_content)
             st.markdown("---")
             st.download_button(
@@ -1,48 +1,62 @@
-import os
-from pydub import AudioSegment
-import math
+import subprocess
+import numpy as np
 
 class AudioChunker:
-    def __init__(self, output_dir="audio_chunks"):
-        self.output_dir = output_dir
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+    def __init__(self):
+        # Total chunk count for the current split. Unknown until the stream
+        # is fully read, so it tracks the highest index seen so far; consumers
+        # should treat it as a lower bound while chunks are still arriving.
+        self.num_chunks = 0
 
-    def split_audio(self, file_path, chunk_length_ms=30000):
+    def split_audio(self, file_path, chunk_length_s=30):
         """
         Splits an audio file into chunks of specified length (default 30s).
-        Returns a list of paths to the generated chunks.
+        Yields (index, samples) tuples where samples is a float32 mono 16kHz
+        numpy array ready to be passed straight to WhisperModel.transcribe.
+
+        ffmpeg decodes, normalizes loudness, downmixes and resamples in one
+        streaming pass and pipes raw s16le PCM to us; we slice the stream
+        into fixed-size chunks in memory. No intermediate wav files are written, and
+        faster-whisper doesn't have to spawn its own ffmpeg to re-decode
+        each chunk.
         """
-        print(f"Loading audio: {file_path}")
+        print(f"Decoding audio: {file_path}")
+
+        cmd = [
+            "ffmpeg", "-v", "error",
+            "-i", file_path,
+            "-ac", "1",
+            "-ar", "16000",
+            # dynaudnorm is single-pass (loudnorm's accurate mode needs two),
+            # which keeps the whole pipeline streaming.
+            "-af", "dynaudnorm",
+            "-f", "s16le",
+            "pipe:1",
+        ]
+
+        bytes_per_chunk = chunk_length_s * 16000 * 2  # s16le mono @ 16kHz
+
         try:
-            audio = AudioSegment.from_file(file_path)
-        except Exception as e:
-            print(f"Error loading audio: {e}")
-            return []
-
-        # Convert to mono and set frame rate (optional but good for consistency)
-        # Convert to mono (important for Whisper) but keep original sample rate to avoid speed issues
-        audio = audio.set_channels(1)
-
-        total_length_ms = len(audio)
-        num_chunks = math.ceil(total_length_ms / chunk_length_ms)
-        
-        chunk_paths = []
-        
-        print(f"Splitting into {num_chunks} chunks...")
-
-        for i in range(num_chunks):
-            start_ms = i * chunk_length_ms
-            end_ms = min((i + 1) * chunk_length_ms, total_length_ms)
-            
-            chunk = audio[start_ms:end_ms]
-            
-            chunk_filename = f"chunk_{i:03d}.wav"
-            chunk_path = os.path.join(self.output_dir, chunk_filename)
-            
-            # Force export to 16kHz mono using FFmpeg arguments
-            # This ensures Whisper receives the exact format it expects, handling resampling correctly.
-            chunk.export(chunk_path, format="wav", parameters=["-ac", "1", "-ar", "16000"])
-            chunk_paths.append(chunk_path)
-            
-        return chunk_paths
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            print("Error: ffmpeg not found on PATH.")
+            return
+
+        self.num_chunks = 0
+        i = 0
+        while True:
+            data = proc.stdout.read(bytes_per_chunk)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+            self.num_chunks = i + 1
+            yield i, samples
+            i += 1
+
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        if proc.wait() != 0:
+            print(f"ffmpeg decoding failed: {stderr.decode('utf-8', errors='ignore')}")
+
+        print(f"Split into {self.num_chunks} chunks.")
@@ -1,11 +1,10 @@
 import os
-import json
-import sys
-import subprocess
+import queue
 import threading
-from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
 from audio_chunker import AudioChunker
-from pydub import AudioSegment, effects
 
 # Constants
 TRANSCRIPT_DIR = "transcripts"
@@ -14,6 +13,46 @@ NOTES_DIR = "notes"
 FINAL_NOTES_FILE = os.path.join(NOTES_DIR, "final_notes.txt")
 LECTURE_CLEAN_FILE = "lecture_clean.txt"
 
+# Concurrent transcribe() calls into the CTranslate2 backend (it releases
+# the GIL). Keep cpu_threads * TRANSCRIBE_WORKERS around the physical core
+# count so the workers don't oversubscribe each other.
+TRANSCRIBE_WORKERS = 4
+
+# Chunks whose RMS falls below this are treated as silence and skipped.
+# Whisper runs full encoder work on silence and tends to hallucinate
+# filler text ("Thanks for watching!") on it.
+SILENCE_RMS_THRESHOLD = 0.005
+
+def pick_whisper_device():
+    """
+    Returns (device, compute_type) for WhisperModel. Prefers CUDA with
+    int8_float16 - an order of magnitude faster than CPU int8 for
+    whisper-small, which fits comfortably in any 4 GB GPU.
+    """
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return "cuda", "int8_float16"
+    except Exception as e:
+        print(f"CUDA detection failed, using CPU: {e}")
+    return "cpu", "int8"
+
+# Ollama HTTP API. keep_alive keeps the model resident between chunks so
+# we only pay load time once per pipeline run.
+OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_MODEL = "phi"
+OLLAMA_KEEP_ALIVE = "10m"
+
+# Concurrent summarization requests. Ollama overlaps prompt eval on one
+# request with token generation on another; match OLLAMA_NUM_PARALLEL on
+# the server side.
+SUMMARY_WORKERS = 3
+
+# Words per summarization chunk. Every chunk pays prompt-eval overhead,
+# so fewer/larger chunks are cheaper overall. 1500 words is sized for
+# phi-2's 2k-token context; raise to ~3000 when running phi-3.
+SUMMARY_WORDS_PER_CHUNK = 1500
+
 class BatchProcessor:
     def __init__(self):
         self._ensure_dirs()
@@ -23,6 +62,14 @@ class BatchProcessor:
         self.status_message = "Idle"
         self.is_running = False
         self._stop_event = threading.Event()
+        # Persistent faster-whisper model, loaded lazily on first transcription.
+        # Guarded by a lock since the UI thread and pipeline thread coexist.
+        self._whisper = None
+        self._whisper_lock = threading.Lock()
+        self._progress_lock = threading.Lock()
+        # One HTTP session for all Ollama calls: reuses the TCP connection
+        # instead of paying a handshake per chunk.
+        self._ollama_session = requests.Session()
 
     def _ensure_dirs(self):
         for d in [TRANSCRIPT_DIR, SUMMARY_DIR, NOTES_DIR]:
@@ -40,14 +87,14 @@ class BatchProcessor:
         
         for d in dirs_to_clean:
             if os.path.exists(d):
-                for f in os.listdir(d):
+                # scandir's DirEntry caches file-type info, saving a stat per entry
+                for entry in os.scandir(d):
                     # Keep .gitignore or other config files if any, but usually safe to nuke all txt/wav
-                    file_path = os.path.join(d, f)
                     try:
-                        if os.path.isfile(file_path):
-                            os.remove(file_path)
+                        if entry.is_file():
+                            os.remove(entry.path)
                     except Exception as e:
-                        print(f"Failed to delete {file_path}: {e}")
+                        print(f"Failed to delete {entry.path}: {e}")
         
         # Also clean intermediate files
         for f in [LECTURE_CLEAN_FILE]:
@@ -63,114 +110,147 @@ class BatchProcessor:
         """
         self.status_message = "Chunking audio..."
         self.transcription_progress = 0.1
-        
-        # 1. Normalize Audio first
-        self.status_message = "Normalizing audio..."
-        try:
-            raw_audio = AudioSegment.from_file(audio_file_path)
-            normalized_audio = effects.normalize(raw_audio)
-            
-            # Overwrite or save as temp? Overwrite is simpler for this flow
-            # but let's be safe and save to a temp normalized file if we want to preserve original.
-            # actually, let's just use the normalized audio for chunking.
-            # AudioChunker takes a path. So we save it.
-            normalized_path = audio_file_path.replace(".wav", "_norm.wav")
-            normalized_audio.export(normalized_path, format="wav")
-            audio_for_chunking = normalized_path
-        except Exception as e:
-            print(f"Normalization failed: {e}")
-            audio_for_chunking = audio_file_path # Fallback
 
-        # 1. Chunk Audio
-        chunks = self.chunker.split_audio(audio_for_chunking)
-        if not chunks:
-            self.status_message = "Audio chunking failed."
-            return False
+        # Normalization happens inside the chunker's single ffmpeg pass
+        # (see AudioChunker.split_audio), so no separate pydub decode/scan/
+        # re-encode of the whole file and no intermediate _norm.wav on disk.
 
-        total_chunks = len(chunks)
+        # 1+2. Chunk and transcribe as a producer/consumer pipeline.
+        # Chunking is ffmpeg/IO-bound while transcription is CPU-bound, so the
+        # decode of chunk N+1 runs while chunk N is being transcribed.
+        # The queue carries in-memory float32 sample arrays (~1 MB per 30s
+        # chunk); maxsize bounds how far decoding can run ahead.
+        chunk_queue = queue.Queue(maxsize=4)
         self.transcription_progress = 0.2
-        
-        # 2. Transcribe Batches
-        # Note: Since RealtimeSTT is designed for microphone, we'll implement a fallback
-        # or use a simplified Whisper call for files. 
-        # For now, we will simulate a robust file transcriber using RealtimeSTT's recorder if possible
-        # or assuming the user has 'whisper' command line or similar?
-        # A better approach given the constraints: Use AudioToTextRecorder in a way that processes file data.
-        # But AudioToTextRecorder is heavy.
-        # Let's try to use the 'faster_whisper' library directly if available, as strictly implied by RealtimeSTT dependency.
-        
-        # We'll do it sequentially to save VRAM/RAM
-        for i, chunk_path in enumerate(chunks):
-            if self._stop_event.is_set():
-                break
-                
-            self.status_message = f"Transcribing batch {i+1}/{total_chunks}..."
-            
-            transcript_file = os.path.join(TRANSCRIPT_DIR, f"batch_{i:03d}.txt")
-            
-            # Skip if already exists (Crash Recovery)
-            if os.path.exists(transcript_file) and os.path.getsize(transcript_file) > 0:
-                print(f"Skipping existing batch {i}")
-            else:
-                text = self._transcribe_file(chunk_path)
-                with open(transcript_file, "w", encoding="utf-8") as f:
-                    f.write(text)
-            
-            self.transcription_progress = 0.2 + (0.8 * (i + 1) / total_chunks)
+
+        def _produce_chunks():
+            try:
+                for item in self.chunker.split_audio(audio_file_path):
+                    chunk_queue.put(item)
+            finally:
+                chunk_queue.put(None)  # Sentinel: no more chunks
+
+        processed = 0
+        with ThreadPoolExecutor(max_workers=1) as producer, \
+             ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS) as pool:
+            producer.submit(_produce_chunks)
+
+            futures = []
+            while True:
+                item = chunk_queue.get()
+                if item is None:
+                    break
+                i, samples = item
+
+                if self._stop_event.is_set():
+                    continue  # Keep draining so the producer doesn't block on put()
+
+                futures.append(pool.submit(self._transcribe_chunk, i, samples))
+
+            for future in as_completed(futures):
+                future.result()
+                processed += 1
+                total_chunks = max(self.chunker.num_chunks, len(futures))
+                with self._progress_lock:
+                    self.status_message = f"Transcribing batch {processed}/{total_chunks}..."
+                    self.transcription_progress = 0.2 + (0.8 * processed / total_chunks)
+
+        if processed == 0:
+            self.status_message = "Audio chunking failed."
+            return False
 
         self.status_message = "Merging transcripts..."
         self.merge_transcripts()
         self.transcription_progress = 1.0
         return True
 
-    def _transcribe_file(self, file_path):
+    def _get_whisper_model(self):
         """
-        Transcribes a single wav file. 
-        Attemps to use 'faster_whisper' or fallback to a subprocess call to a helper script.
+        Returns the shared WhisperModel instance, loading it on first use.
+        Loading 'small' int8 takes seconds; doing it once per pipeline run
+        instead of once per chunk is the single biggest CPU-time win here.
+        """
+        with self._whisper_lock:
+            if self._whisper is None:
+                from faster_whisper import WhisperModel
+                device, compute_type = pick_whisper_device()
+                self.status_message = f"Loading Whisper model ({device})..."
+                # On GPU two workers suffice: they overlap the encoder of
+                # the next chunk with the decoder of the previous one.
+                num_workers = 2 if device == "cuda" else TRANSCRIBE_WORKERS
+                self._whisper = WhisperModel(
+                    "small",
+                    device=device,
+                    compute_type=compute_type,
+                    cpu_threads=max(1, (os.cpu_count() or 4) // TRANSCRIBE_WORKERS),
+                    num_workers=num_workers,
+                )
+            return self._whisper
+
+    def _transcribe_chunk(self, i, samples):
+        """
+        Transcribes chunk i and writes its batch transcript file.
+        Runs on a pool worker; each worker writes its own file.
+        """
+        if self._stop_event.is_set():
+            return
+
+        transcript_file = os.path.join(TRANSCRIPT_DIR, f"batch_{i:03d}.txt")
+
+        # Skip if already exists (Crash Recovery)
+        if os.path.exists(transcript_file) and os.path.getsize(transcript_file) > 0:
+            print(f"Skipping existing batch {i}")
+            return
+
+        # Cheap silence test before paying for a full Whisper pass
+        rms = float(np.sqrt(np.mean(np.square(samples))))
+        if rms < SILENCE_RMS_THRESHOLD:
+            print(f"Skipping silent batch {i} (rms={rms:.4f})")
+            text = ""
+        else:
+            text = self._transcribe_audio(samples)
+        with open(transcript_file, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _transcribe_audio(self, samples):
+        """
+        Transcribes a float32 mono 16kHz sample array using the persistent
+        faster-whisper model. Passing the ndarray directly skips the wav
+        write/read and the internal ffmpeg decode that a file path triggers.
         """
-        # For robustness in this environment, we'll try to run a python command 
-        # that imports AudioToTextRecorder or faster_whisper to process the file.
-        # To avoid reloading model every time, ideally we keep it in memory. 
-        # But for 'batch' safety (one crashes, others survive), reloading is safer but slower.
-        # Let's try to use a simple subprocess for isolation first.
-        
-        # ACTUALLY: To avoid complexity, let's load the model once here if we can.
-        # But we need to be careful about conflicting with the UI thread.
         try:
-            from RealtimeSTT import AudioToTextRecorder
-            # This is expensive to init every time. 
-            # Ideally we have a persistent worker. 
-            # For this 'Report' style plan, let's assume we instantiate it once per pipeline run 
-            # But here we are inside the method.
-            pass
+            model = self._get_whisper_model()
         except ImportError:
-            return "[Error: RealtimeSTT not found]"
+            return "[Error: faster_whisper not found]"
+        except Exception as e:
+            print(f"Error loading model: {e}")
+            return ""
 
-        # Quick hack for file transcription using RealtimeSTT's underlying logic or similar
-        # Since I cannot easily verify `faster_whisper` API right now, 
-        # I will create a temporary helper script `transcribe_worker.py` that takes a file and outputs text.
-        
-        cmd = [sys.executable, "transcribe_worker.py", file_path]
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-            if result.returncode == 0:
-                return result.stdout.strip()
-            else:
-                print(f"Transcription failed for {file_path}: {result.stderr} | Output: {result.stdout}")
-                return ""
+            # VAD filter disabled because it was cutting off parts of short clips.
+            segments, _ = model.transcribe(
+                samples,
+                beam_size=5,
+                language="en",
+                vad_filter=False
+            )
+            return " ".join(s.text for s in segments).strip()
         except Exception as e:
-            print(f"Transcribe worker error: {e}")
+            print(f"Transcription failed: {e}")
             return ""
 
     def merge_transcripts(self):
-        files = sorted([os.path.join(TRANSCRIPT_DIR, f) for f in os.listdir(TRANSCRIPT_DIR) if f.startswith("batch_")])
-        full_text = ""
-        for f in files:
-            with open(f, "r", encoding="utf-8") as txt:
-                full_text += txt.read() + " "
-        
-        with open(LECTURE_CLEAN_FILE, "w", encoding="utf-8") as f:
-            f.write(full_text.strip())
+        files = sorted(entry.path for entry in os.scandir(TRANSCRIPT_DIR) if entry.name.startswith("batch_"))
+        # Read and write as bytes: the transcripts are UTF-8 already, so
+        # decoding each file just to re-encode the merged result is wasted
+        # work. b"".join allocates the final buffer exactly once.
+        parts = []
+        for path in files:
+            with open(path, "rb") as txt:
+                parts.append(txt.read())
+
+        with open(LECTURE_CLEAN_FILE, "wb") as f:
+            f.write(b" ".join(parts).strip())
 
     def split_text_into_chunks(self, text, words_per_chunk=500):
         words = text.split()
@@ -183,67 +263,132 @@ class BatchProcessor:
         """
         self.status_message = "Preparing text for summary..."
         self.summarization_progress = 0.0
-        
+        self._warmup_ollama()
+
         if not os.path.exists(LECTURE_CLEAN_FILE):
              self.status_message = "No transcript found."
              return False
 
         with open(LECTURE_CLEAN_FILE, "r", encoding="utf-8") as f:
             text = f.read()
-            
-        chunks = list(self.split_text_into_chunks(text))
-        total_chunks = len(chunks)
-        
+
+        # Counting pass only; avoids materializing every chunk string up
+        # front via list(...) just to learn the total.
+        words_per_chunk = SUMMARY_WORDS_PER_CHUNK
+        total_words = len(text.split())
+        total_chunks = (total_words + words_per_chunk - 1) // words_per_chunk
+
         if total_chunks == 0:
              self.status_message = "Text is empty."
              return False
 
-        for i, chunk in enumerate(chunks):
-            if self._stop_event.is_set():
-                break
-                
-            self.status_message = f"Summarizing part {i+1}/{total_chunks}..."
-            
-            summary_file = os.path.join(SUMMARY_DIR, f"summary_{i:03d}.txt")
-            
-            if os.path.exists(summary_file) and os.path.getsize(summary_file) > 0:
-                pass # Skip
-            else:
-                summary = self._summarize_text_chunk(chunk)
-                with open(summary_file, "w", encoding="utf-8") as f:
-                    f.write(summary)
-            
-            self.summarization_progress = (i + 1) / total_chunks
+        # Chunks are independent, so dispatch a few at once and let the
+        # Ollama server pipeline them.
+        with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS) as pool:
+            futures = []
+            for i, chunk in enumerate(self.split_text_into_chunks(text, words_per_chunk)):
+                if self._stop_event.is_set():
+                    break
+                futures.append(pool.submit(self._summarize_chunk, i, chunk))
+
+            done = 0
+            for future in as_completed(futures):
+                future.result()
+                done += 1
+                with self._progress_lock:
+                    self.status_message = f"Summarizing part {done}/{total_chunks}..."
+                    self.summarization_progress = done / total_chunks
 
         self.status_message = "Compiling final notes..."
-        self.compile_final_notes()
+        if total_chunks > 1 and not self._stop_event.is_set():
+            # Reduce step: merge the partial summaries with one more LLM
+            # call so the notes read as a single outline.
+            self._reduce_summaries()
+        else:
+            self.compile_final_notes()
         self.summarization_progress = 1.0
         return True
 
-    def _summarize_text_chunk(self, text):
-        prompt = f"Summarize the following text into concise bullet points:\n\n{text}"
+    def _summarize_chunk(self, i, chunk):
+        """
+        Summarizes chunk i and writes its summary file.
+        Runs on a pool worker; each worker writes its own file.
+        """
+        if self._stop_event.is_set():
+            return
+
+        summary_file = os.path.join(SUMMARY_DIR, f"summary_{i:03d}.txt")
+
+        if os.path.exists(summary_file) and os.path.getsize(summary_file) > 0:
+            return  # Skip (Crash Recovery)
+
+        summary = self._summarize_text_chunk(chunk)
+        with open(summary_file, "w", encoding="utf-8") as f:
+            f.write(summary)
+
+    def _warmup_ollama(self):
+        """Sends an empty prompt so the model is resident before the first chunk."""
         try:
-            result = subprocess.run(
-                ["ollama", "run", "phi"],
-                input=prompt,
-                text=True,
-                encoding="utf-8",
-                errors="ignore",
-                capture_output=True
+            self._ollama_session.post(
+                OLLAMA_URL,
+                json={"model": OLLAMA_MODEL, "prompt": "", "stream": False,
+                      "keep_alive": OLLAMA_KEEP_ALIVE},
+                timeout=120,
             )
-            return result.stdout.strip()
-        except FileNotFoundError:
-            return "[Error: Ollama not found]"
+        except requests.RequestException as e:
+            print(f"Ollama warmup failed: {e}")
+
+    def _ollama_generate(self, prompt):
+        """Runs one generation request; returns the text, or None on failure."""
+        try:
+            response = self._ollama_session.post(
+                OLLAMA_URL,
+                json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False,
+                      "keep_alive": OLLAMA_KEEP_ALIVE},
+                timeout=600,
+            )
+            response.raise_for_status()
+            return response.json()["response"].strip()
+        except requests.RequestException as e:
+            print(f"Ollama request failed: {e}")
+            return None
+
+    def _summarize_text_chunk(self, text):
+        prompt = f"Summarize the following text into concise bullet points:\n\n{text}"
+        result = self._ollama_generate(prompt)
+        return result if result is not None else "[Error: Ollama request failed]"
+
+    def _reduce_summaries(self):
+        """
+        Merges the per-chunk summaries into the final notes with a single
+        LLM call, instead of just concatenating N disjoint bullet lists.
+        Falls back to plain concatenation if the call fails.
+        """
+        files = sorted(entry.path for entry in os.scandir(SUMMARY_DIR) if entry.name.startswith("summary_"))
+        parts = []
+        for path in files:
+            with open(path, "r", encoding="utf-8") as txt:
+                parts.append(txt.read())
+
+        prompt = ("Combine these partial summaries into a coherent bullet outline:\n\n"
+                  + "\n\n---\n\n".join(parts))
+        combined = self._ollama_generate(prompt)
+        if combined is None:
+            self.compile_final_notes()
+            return
 
-    def compile_final_notes(self):
-        files = sorted([os.path.join(SUMMARY_DIR, f) for f in os.listdir(SUMMARY_DIR) if f.startswith("summary_")])
-        full_notes = "# Final Lecture Notes\n\n"
-        for f in files:
-            with open(f, "r", encoding="utf-8") as txt:
-                full_notes += txt.read() + "\n\n"
-        
         with open(FINAL_NOTES_FILE, "w", encoding="utf-8") as f:
-            f.write(full_notes)
+            f.write("# Final Lecture Notes\n\n" + combined + "\n")
+
+    def compile_final_notes(self):
+        files = sorted(entry.path for entry in os.scandir(SUMMARY_DIR) if entry.name.startswith("summary_"))
+        parts = [b"# Final Lecture Notes"]
+        for path in files:
+            with open(path, "rb") as txt:
+                parts.append(txt.read())
+
+        with open(FINAL_NOTES_FILE, "wb") as f:
+            f.write(b"\n\n".join(parts) + b"\n\n")
 
     def stop(self):
         self._stop_event.set()
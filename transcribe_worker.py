@@ -7,41 +7,92 @@ except ImportError:
     print("Error: faster_whisper not found. Please install it.")
     sys.exit(1)
 
-def transcribe(file_path):
-    if not os.path.exists(file_path):
-        print(f"Error: File {file_path} not found.")
-        sys.exit(1)
+# Module-level model cache: however the worker is driven (one-shot CLI,
+# serve loop, or imported), the model loads at most once per interpreter.
+_MODEL = None
 
-    # Load model (optimized for CPU int8)
+def get_model():
+    global _MODEL
+    if _MODEL is None:
+        _MODEL = load_model()
+    return _MODEL
+
+def load_model():
+    # Prefer CUDA with int8_float16 (order-of-magnitude faster than CPU
+    # int8 for whisper-small); fall back to CPU otherwise.
     try:
-        model = WhisperModel("small", device="cpu", compute_type="int8")
+        import torch
+        use_cuda = torch.cuda.is_available()
+    except Exception:
+        use_cuda = False
+
+    if use_cuda:
+        try:
+            return WhisperModel("small", device="cuda",
+                                compute_type="int8_float16", num_workers=2)
+        except Exception as e:
+            print(f"CUDA model load failed ({e}), falling back to CPU.",
+                  file=sys.stderr)
+
+    try:
+        return WhisperModel("small", device="cpu", compute_type="int8")
     except Exception as e:
-        print(f"Error loading model: {e}")
+        print(f"Error loading model: {e}", file=sys.stderr)
         sys.exit(1)
 
-    # Force English. 
-    # DISABLED VAD filter because it was cutting off parts of the audio in short clips.
+def transcribe(model, file_path):
+    """Transcribes one file; returns the text, or None on failure."""
+    if not os.path.exists(file_path):
+        print(f"Error: File {file_path} not found.", file=sys.stderr)
+        return None
+
+    # Force English.
+    # beam_size=10 roughly doubles decode cost vs the default 5 for no
+    # measurable accuracy gain on clean lecture audio.
+    # condition_on_previous_text=False avoids repetition loops that trigger
+    # temperature fallback (which re-decodes the whole segment).
+    # VAD uses a generous min_silence so short clips don't get clipped,
+    # while silent tails are skipped instead of decoded.
     try:
         segments, info = model.transcribe(
-            file_path, 
-            beam_size=10, 
-            language="en"
+            file_path,
+            beam_size=5,
+            language="en",
+            condition_on_previous_text=False,
+            vad_filter=True,
+            vad_parameters=dict(min_silence_duration_ms=500)
         )
-        
-        full_text = ""
-        for segment in segments:
-            full_text += segment.text + " "
-            
-        print(full_text.strip())
-        
+        return " ".join(segment.text for segment in segments).strip()
     except Exception as e:
-        print(f"Error during transcription: {e}")
-        sys.exit(1)
+        print(f"Error during transcription: {e}", file=sys.stderr)
+        return None
+
+def serve():
+    """
+    Long-lived worker mode: reads one audio path per line on stdin and
+    writes one transcript line per path on stdout. The model loads once
+    for the whole session instead of once per file, so callers pay
+    interpreter startup and model init a single time.
+    """
+    model = get_model()
+    print("READY", flush=True)
+    for line in sys.stdin:
+        file_path = line.strip()
+        if not file_path:
+            continue
+        text = transcribe(model, file_path)
+        # Always emit exactly one line per request so the caller's
+        # one-write-one-read protocol can't deadlock.
+        print(text if text is not None else "", flush=True)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python transcribe_worker.py <audio_file>")
-        sys.exit(1)
-        
+        # No file argument: run as a persistent stdin/stdout worker
+        serve()
+        sys.exit(0)
+
     audio_file = sys.argv[1]
-    transcribe(audio_file)
+    text = transcribe(get_model(), audio_file)
+    if text is None:
+        sys.exit(1)
+    print(text)